@@ -5,93 +5,477 @@ from tkinter import filedialog, messagebox, ttk, scrolledtext, PhotoImage
 
 # Importar módulos para el cálculo del NDVI
 import rasterio
+from rasterio.enums import Resampling
 import numpy as np
 import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Importar numexpr (opcional) para evaluar el NDVI en una sola pasada sobre los datos
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+# Importar numba (opcional) para compilar el núcleo del NDVI a código nativo en paralelo
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # Importar Pillow para manejar imágenes
 from PIL import Image, ImageTk  # Importar Image y ImageTk
 
+# Activar para imprimir estadísticas de depuración (recorren los arrays varias veces más)
+DEBUG = False
+
+# --- Núcleo numérico del NDVI ---
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _ndvi_numba(banda_rojo, banda_nir, ndvi):
+        # Un solo recorrido por píxel con escalares en registros; las filas se reparten entre hilos.
+        # No se usa fastmath porque eliminaría las comprobaciones de NaN.
+        for i in prange(banda_rojo.shape[0]):
+            for j in range(banda_rojo.shape[1]):
+                rojo = banda_rojo[i, j]
+                nir = banda_nir[i, j]
+                denominador = nir + rojo
+                # denominador == denominador es falso solo si es NaN
+                if denominador != 0 and denominador == denominador:
+                    ndvi[i, j] = (nir - rojo) / denominador
+                else:
+                    ndvi[i, j] = np.nan
+        return ndvi
+
+    # Compilar y lanzar el núcleo una vez en el hilo principal. El cálculo corre en un hilo de
+    # trabajo, y si el pool de hilos de numba se inicia desde ahí el intérprete puede quedarse
+    # colgado al cerrar. Con cache=True solo la primera sesión paga la compilación.
+    _ndvi_numba(np.zeros((1, 1), dtype=np.float32), np.zeros((1, 1), dtype=np.float32),
+                np.empty((1, 1), dtype=np.float32))
+else:
+    _ndvi_numba = None
+
+
+# --- Buffers reutilizables ---
+# Un array de trabajo plano por (nombre, dtype). Los bloques más pequeños (teselas del borde,
+# vistas previas) usan una vista de su parte inicial, así que la memoria queda acotada al
+# bloque más grande visto y después de la primera tesela no se vuelve a reservar.
+# Solo los usa el hilo de cálculo.
+_BUFFERS = {}
+
+
+def _obtener_buffer(nombre, forma, dtype):
+    """
+    Retorna un array contiguo sin inicializar de la forma indicada para el uso nombrado.
+    Reutiliza el buffer anterior si es lo bastante grande; si no, lo reemplaza por uno mayor.
+    El contenido solo es válido hasta la siguiente llamada con el mismo nombre.
+    """
+    clave = (nombre, np.dtype(dtype))
+    tamano = int(np.prod(forma))
+    buffer = _BUFFERS.get(clave)
+    if buffer is None or buffer.size < tamano:
+        buffer = _BUFFERS[clave] = np.empty(tamano, dtype=dtype)
+    return buffer[:tamano].reshape(forma)
+
+
+def _calcular_indice(banda_rojo, banda_nir):
+    """
+    Calcula (NIR - Rojo) / (NIR + Rojo) sobre dos arrays float32 del mismo tamaño.
+    Los píxeles con denominador cero o sin datos (NaN) quedan como NaN.
+    Usa numba si está instalado, si no numexpr y, en último caso, NumPy.
+    Con numba o NumPy, los arrays de entrada se reutilizan (se sobrescriben) para el resultado;
+    con numexpr se escribe en un buffer reutilizable, válido hasta la siguiente llamada.
+    """
+    if _ndvi_numba is not None:
+        return _ndvi_numba(banda_rojo, banda_nir, banda_nir)
+
+    if ne is not None:
+        # numexpr fusiona suma, resta, división y máscara en un único recorrido por bloques
+        # del tamaño de la caché, sin crear los arrays temporales intermedios
+        return ne.evaluate(
+            "where((nir + red) != 0, (nir - red) / (nir + red), nan_val)",
+            local_dict={'nir': banda_nir, 'red': banda_rojo,
+                        'nan_val': np.float32(np.nan)},
+            out=_obtener_buffer('ndvi', banda_rojo.shape, np.float32))
+
+    denominador = np.add(banda_nir, banda_rojo, out=_obtener_buffer(
+        'denominador', banda_rojo.shape, np.float32))
+
+    # Máscara para píxeles donde el cálculo es válido (denominador finito y distinto de cero).
+    # Un NaN en cualquiera de las bandas se propaga al denominador, así que basta con revisar
+    # este único array en vez de las dos bandas por separado
+    mascara_valida = np.isfinite(denominador, out=_obtener_buffer(
+        'mascara', banda_rojo.shape, np.bool_))
+    mascara_valida &= denominador != 0
+
+    # Operar en el sitio: el numerador reutiliza el buffer de la banda NIR
+    numerador = np.subtract(banda_nir, banda_rojo, out=banda_nir)
+    # La banda Roja ya no se necesita: su buffer recibe el resultado, inicializado con NaN,
+    # y la división solo escribe los píxeles válidos en un recorrido contiguo (sin indexar
+    # con máscaras), así los no válidos quedan como NaN (también los nodata originales)
+    ndvi = banda_rojo
+    ndvi.fill(np.nan)
+    np.divide(numerador, denominador, out=ndvi, where=mascara_valida)
+    return ndvi
+
+
+# Configuración de GDAL para todas las lecturas y escrituras con rasterio:
+# - GDAL_CACHEMAX: caché de bloques de 1024 MB en vez de la predeterminada (5% de la RAM)
+# - GDAL_NUM_THREADS: decodificar/comprimir cada raster con todos los núcleos
+# - GDAL_DISABLE_READDIR_ON_OPEN: no listar el directorio al abrir (lento en carpetas con
+#   muchas escenas o remotas). Con TRUE se siguen buscando los archivos auxiliares
+#   (.aux.xml, .ovr, .tfw) uno por uno; EMPTY_DIR los ignoraría y podría perder la georreferencia
+# - CPL_VSIL_CURL_USE_HEAD: evitar la petición HEAD extra al abrir rasters remotos (/vsicurl/)
+# No se fija CPL_VSIL_CURL_ALLOWED_EXTENSIONS: solo afecta a rutas /vsicurl/ y limitarla a
+# .tif/.jp2 rompería rasters remotos con otras extensiones o con parámetros en la URL.
+# Los hilos auxiliares de lectura vuelven a abrir este entorno (ver _leer_en_entorno).
+OPCIONES_GDAL = {
+    'GDAL_CACHEMAX': 1024,
+    'GDAL_NUM_THREADS': 'ALL_CPUS',
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'TRUE',
+    'CPL_VSIL_CURL_USE_HEAD': 'NO',
+}
+
+# Opciones de creación del GeoTIFF de salida: teselas de 512x512 (el tamaño de bloque
+# preferido por GDAL y los COG) comprimidas con zstd. El predictor 3 (coma flotante)
+# aprovecha que el NDVI varía suavemente y mejora 2-3 veces la compresión.
+OPCIONES_GEOTIFF_SALIDA = {
+    'tiled': True,
+    'blockxsize': 512,
+    'blockysize': 512,
+    'compress': 'zstd',
+    'zstd_level': 6,
+    'predictor': 3,
+    'BIGTIFF': 'IF_SAFER',
+}
+
+# Factores de reducción de las overviews internas del GeoTIFF de salida
+NIVELES_OVERVIEW = [2, 4, 8, 16, 32]
+
+
+def _calcular_niveles_overview(alto, ancho):
+    """
+    Retorna los factores de NIVELES_OVERVIEW aplicables a un raster de alto x ancho:
+    ninguno si cabe en una sola tesela (la pirámide no aportaría nada) y, si no, solo
+    los que dejan al menos un píxel en el lado más corto (GDAL rechaza los demás).
+    """
+    if alto <= OPCIONES_GEOTIFF_SALIDA['blockysize'] and ancho <= OPCIONES_GEOTIFF_SALIDA['blockxsize']:
+        return []
+    return [factor for factor in NIVELES_OVERVIEW if min(alto, ancho) // factor >= 1]
+
+
+# Parte de la barra de progreso que corresponde al recorrido por bloques; el resto
+# se completa al terminar de construir las overviews
+FRACCION_BLOQUES = 0.9
+
+# El NDVI está acotado a [-1, 1]: al guardarlo como int8 escalado por 127 el error de
+# cuantización (< 0.004) queda muy por debajo de la precisión real del índice
+ESCALA_INT8 = 127
+NODATA_INT8 = -128
+
+
+def _cuantizar_int8(ndvi):
+    """
+    Convierte un bloque NDVI float32 a int8 (NDVI x ESCALA_INT8, redondeado).
+    Los píxeles sin datos (NaN) pasan a NODATA_INT8.
+    """
+    with np.errstate(invalid='ignore'):
+        cuantizado = np.clip(np.rint(ndvi * ESCALA_INT8),
+                             -ESCALA_INT8, ESCALA_INT8)
+    return np.where(np.isnan(ndvi), NODATA_INT8, cuantizado).astype(np.int8)
+
+
+def _copiar_a_vista_previa(ndvi, ventana, filas_origen, cols_origen, vista_previa):
+    """
+    Copia a la vista previa los píxeles de un bloque NDVI que corresponden a sus
+    filas y columnas de origen (vecino más cercano, índices crecientes en el raster completo).
+    """
+    fila_inicio, col_inicio = int(ventana.row_off), int(ventana.col_off)
+    # Rango de filas y columnas de la vista previa cuyo píxel de origen cae en este bloque
+    f0, f1 = np.searchsorted(filas_origen, [fila_inicio, fila_inicio + ndvi.shape[0]])
+    c0, c1 = np.searchsorted(cols_origen, [col_inicio, col_inicio + ndvi.shape[1]])
+    vista_previa[f0:f1, c0:c1] = ndvi[np.ix_(filas_origen[f0:f1] - fila_inicio,
+                                             cols_origen[c0:c1] - col_inicio)]
+
+
+# --- Caché de resultados ---
+# Vista previa y archivo de salida de los últimos cálculos, indexados por
+# (ruta_rojo, ruta_nir, mtime_rojo, mtime_nir). Solo la usa el hilo de cálculo.
+_NDVI_CACHE = OrderedDict()
+MAX_ENTRADAS_CACHE = 2  # Limitar la memoria retenida a unas pocas vistas previas
+
+
+def _buscar_en_cache(clave, ruta_salida):
+    """
+    Retorna la vista previa guardada para la clave si el archivo de salida calculado antes
+    sigue intacto, copiándolo a ruta_salida si esta es distinta. De lo contrario None.
+    """
+    entrada = _NDVI_CACHE.get(clave)
+    if entrada is None:
+        return None
+    vista_previa, ruta_guardada, mtime_guardado = entrada
+    # El archivo calculado antes debe existir y no haber cambiado
+    if not os.path.exists(ruta_guardada) or os.stat(ruta_guardada).st_mtime_ns != mtime_guardado:
+        del _NDVI_CACHE[clave]
+        return None
+
+    if os.path.abspath(ruta_salida) != os.path.abspath(ruta_guardada):
+        # Crear directorio de salida si no existe
+        directorio_salida = os.path.dirname(ruta_salida)
+        if directorio_salida and not os.path.exists(directorio_salida):
+            os.makedirs(directorio_salida)
+        shutil.copyfile(ruta_guardada, ruta_salida)
+
+    _NDVI_CACHE.move_to_end(clave)
+    return vista_previa
+
+
+def _guardar_en_cache(clave, vista_previa, ruta_salida):
+    """Guarda un resultado en la caché, descartando el más antiguo si está llena."""
+    _NDVI_CACHE[clave] = (vista_previa, ruta_salida,
+                          os.stat(ruta_salida).st_mtime_ns)
+    _NDVI_CACHE.move_to_end(clave)
+    while len(_NDVI_CACHE) > MAX_ENTRADAS_CACHE:
+        _NDVI_CACHE.popitem(last=False)
+
+
+def _leer_en_entorno(src, **opciones_lectura):
+    """
+    Lee la banda 1 de src dentro de rasterio.Env(**OPCIONES_GDAL). Se usa en los hilos
+    auxiliares de lectura: fuera del hilo principal rasterio aplica la configuración de GDAL
+    solo al hilo que abrió el entorno, así que cada hilo auxiliar debe abrir el suyo.
+    """
+    with rasterio.Env(**OPCIONES_GDAL):
+        return src.read(1, **opciones_lectura)
+
+
+# Máscara de permisos del proceso, leída una vez al iniciar (os.umask solo se puede
+# consultar cambiándola, así que se hace antes de que existan otros hilos)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _ruta_normalizada(ruta):
+    """Ruta absoluta y sin enlaces simbólicos, para comparar si dos rutas son el mismo archivo."""
+    return os.path.normcase(os.path.realpath(ruta))
+
+
 # --- Función para realizar el cálculo del NDVI ---
 # Esta función es la misma lógica que usamos en los scripts anteriores
 
 
-def calcular_ndvi(ruta_rojo, ruta_nir, ruta_salida, label_estado):
+def calcular_ndvi(ruta_rojo, ruta_nir, ruta_salida, progreso=None, cuantizar_int8=False):
     """
     Calcula el NDVI a partir de las rutas de las bandas Roja y NIR,
     y guarda el resultado en la ruta de salida especificada.
-    Actualiza una etiqueta de estado en la GUI.
-    Retorna el array NDVI calculado si es exitoso, de lo contrario None.
+    Se ejecuta en un hilo de trabajo, por lo que no toca la GUI: los errores se propagan
+    como excepciones y el avance se informa llamando a progreso(fraccion) si se indica.
+    Con cuantizar_int8 el archivo se guarda como int8 (NDVI x127) en vez de float32.
+    Retorna una vista previa reducida del NDVI.
     """
-    # Validar que las rutas no estén vacías
-    if not ruta_rojo or not ruta_nir or not ruta_salida:
-        messagebox.showwarning(
-            "Advertencia", "Por favor, especifica las rutas de los archivos de entrada y salida.")
-        label_estado.config(text="Estado: Faltan rutas", foreground="red")
-        return None  # Indicar que hubo un problema
-
-    # Actualizar el estado en la GUI
-    label_estado.config(text="Estado: Calculando...", foreground="orange")
-    # Forzar la actualización de la GUI para que se actualice el texto cambie inmediatamente
-    label_estado.update_idletasks()
-
-    try:
-        # --- Lógica del cálculo del NDVI ---
-        # Imprimir en consola para depuración
-        print(
-            f"Iniciando cálculo para:\n Rojo: {ruta_rojo}\n NIR: {ruta_nir}\n Salida: {ruta_salida}")
-
-        # Verificar si los archivos de entrada existen
-        if not os.path.exists(ruta_rojo):
-            raise FileNotFoundError(f"Archivo no encontrado: {ruta_rojo}")
-        if not os.path.exists(ruta_nir):
-            raise FileNotFoundError(f"Archivo no encontrado: {ruta_nir}")
-
-        # Abrir las bandas usando rasterio
-        with rasterio.open(ruta_rojo) as src_rojo:
-            banda_rojo = src_rojo.read(1)
-            perfil_salida = src_rojo.profile
-
-        with rasterio.open(ruta_nir) as src_nir:
-            banda_nir = src_nir.read(1)
-
-        # Convertir a tipo float32 para el cálculo
-        banda_rojo_float = banda_rojo.astype('float32')
-        banda_nir_float = banda_nir.astype('float32')
-
-        # Calcular NDVI, manejando la división por cero y valores sin datos
-        denominador = banda_nir_float + banda_rojo_float
-        # Inicializar con NaN. Esto también maneja los nodata originales si rasterio los lee como tal.
-        ndvi = np.full(banda_rojo_float.shape, np.nan, dtype='float32')
-
-        # Máscara para píxeles donde el cálculo es válido (denominador no es cero y no son NaN originales si los hubiera)
-        # Consideramos válido si el denominador no es cero Y si las bandas de entrada no eran NaN (aunque rasterio read(1) suele manejar esto)
-        mascara_valida = (denominador != 0) & (
-            ~np.isnan(banda_rojo_float)) & (~np.isnan(banda_nir_float))
-
-        # Realizar el cálculo del NDVI solo para los píxeles válidos
-        # Suprimir advertencias de NaN en la división
-        with np.errstate(invalid='ignore'):
-            ndvi[mascara_valida] = (banda_nir_float[mascara_valida] -
-                                    banda_rojo_float[mascara_valida]) / denominador[mascara_valida]
-
-        print("Cálculo de NDVI completado.")
-
-        # --- Guardar el resultado ---
+    # --- Lógica del cálculo del NDVI ---
+    # Imprimir en consola para depuración
+    print(
+        f"Iniciando cálculo para:\n Rojo: {ruta_rojo}\n NIR: {ruta_nir}\n Salida: {ruta_salida}")
+
+    # Verificar si los archivos de entrada existen
+    if not os.path.exists(ruta_rojo):
+        raise FileNotFoundError(f"Archivo no encontrado: {ruta_rojo}")
+    if not os.path.exists(ruta_nir):
+        raise FileNotFoundError(f"Archivo no encontrado: {ruta_nir}")
+
+    # La salida no puede reemplazar una de las bandas que se están leyendo
+    if _ruta_normalizada(ruta_salida) in (_ruta_normalizada(ruta_rojo), _ruta_normalizada(ruta_nir)):
+        raise ValueError(
+            "La ruta de salida no puede ser la misma que la de una banda de entrada.")
+
+    # Si las mismas bandas (sin modificar) ya se calcularon, reutilizar el resultado
+    clave_cache = (ruta_rojo, ruta_nir, os.stat(ruta_rojo).st_mtime_ns,
+                   os.stat(ruta_nir).st_mtime_ns, cuantizar_int8)
+    vista_previa = _buscar_en_cache(clave_cache, ruta_salida)
+    if vista_previa is not None:
+        print("Resultado reutilizado de la caché.")
+        if progreso is not None:
+            progreso(1.0)
+        return vista_previa
+
+    # Abrir las bandas usando rasterio. Se procesan bloque a bloque (según la estructura
+    # interna del raster) para que la memoria dependa del tamaño del bloque y no de la imagen.
+    with rasterio.Env(**OPCIONES_GDAL), \
+            rasterio.open(ruta_rojo) as src_rojo, rasterio.open(ruta_nir) as src_nir:
+        if src_rojo.shape != src_nir.shape:
+            raise ValueError(
+                f"Las bandas tienen dimensiones distintas: Rojo {src_rojo.shape}, NIR {src_nir.shape}")
+
+        # --- Preparar el resultado ---
+        # Se parte del perfil de la banda Roja (georreferenciación), pero el archivo de salida
+        # siempre es un GeoTIFF en teselas comprimidas, aunque la entrada sea JP2 o esté en franjas
+        perfil_salida = src_rojo.profile
         perfil_salida.update(
+            driver='GTiff',
             dtype=rasterio.float32,
             count=1,
-            nodata=np.nan  # Asegurarse de que el archivo de salida tenga NaN como nodata
+            nodata=np.nan,  # Asegurarse de que el archivo de salida tenga NaN como nodata
+            **OPCIONES_GEOTIFF_SALIDA
         )
+        if cuantizar_int8:
+            # 1 byte por píxel en vez de 4, con NODATA_INT8 como valor sin datos.
+            # Para enteros se usa el predictor horizontal en lugar del de coma flotante
+            perfil_salida.update(dtype=rasterio.int8,
+                                 nodata=NODATA_INT8, predictor=2)
 
         # Crear directorio de salida si no existe
         directorio_salida = os.path.dirname(ruta_salida)
         if directorio_salida and not os.path.exists(directorio_salida):
             os.makedirs(directorio_salida)
 
-        with rasterio.open(ruta_salida, 'w', **perfil_salida) as dst:
-            dst.write(ndvi, 1)
+        # Vista previa reducida que se llena mientras se recorren los bloques,
+        # así la GUI no necesita el NDVI completo en memoria
+        alto, ancho = src_rojo.shape
+        alto_vista, ancho_vista = _calcular_tamano_vista(alto, ancho)
+        # Píxel del raster completo que representa a cada fila y columna de la vista previa
+        filas_origen = ((np.arange(alto_vista) + 0.5) * alto / alto_vista).astype(np.intp)
+        cols_origen = ((np.arange(ancho_vista) + 0.5) * ancho / ancho_vista).astype(np.intp)
+        vista_previa = np.empty((alto_vista, ancho_vista), dtype='float32')
+
+        # Escribir en un archivo temporal del mismo directorio y reemplazar la salida solo al final:
+        # si una lectura falla a mitad, el archivo anterior del usuario queda intacto
+        descriptor, ruta_temporal = tempfile.mkstemp(
+            suffix='.tif', dir=directorio_salida or os.curdir)
+        os.close(descriptor)
+        # mkstemp crea el archivo solo para el usuario (0600); darle los permisos habituales
+        os.chmod(ruta_temporal, 0o666 & ~_UMASK)
+        try:
+            # Hilo auxiliar para leer la banda Roja mientras este hilo lee la NIR:
+            # rasterio libera el GIL durante la E/S de GDAL, así ambas lecturas se solapan
+            with rasterio.open(ruta_temporal, 'w', **perfil_salida) as dst, \
+                    ThreadPoolExecutor(max_workers=1) as lector_rojo:
+                # Recorrer las teselas del archivo de salida: cada una se comprime y escribe
+                # una sola vez, sin importar la estructura de bloques de las entradas
+                ventanas = [ventana for _, ventana in dst.block_windows(1)]
+                for numero, ventana in enumerate(ventanas, start=1):
+                    # Se leen directamente como float32 en buffers reutilizados entre bloques:
+                    # GDAL convierte el tipo al decodificar, sin copias ni reservas nuevas
+                    forma_bloque = (int(ventana.height), int(ventana.width))
+                    futuro_rojo = lector_rojo.submit(
+                        _leer_en_entorno, src_rojo, window=ventana,
+                        out=_obtener_buffer('rojo', forma_bloque, np.float32))
+                    banda_nir = src_nir.read(
+                        1, window=ventana, out=_obtener_buffer('nir', forma_bloque, np.float32))
+                    banda_rojo = futuro_rojo.result()
+
+                    # Calcular NDVI, manejando la división por cero y valores sin datos
+                    ndvi = _calcular_indice(banda_rojo, banda_nir)
+
+                    if cuantizar_int8:
+                        dst.write(_cuantizar_int8(ndvi), 1, window=ventana)
+                    else:
+                        dst.write(ndvi, 1, window=ventana)
+                    _copiar_a_vista_previa(ndvi, ventana, filas_origen, cols_origen, vista_previa)
+
+                    if progreso is not None:
+                        progreso(FRACCION_BLOQUES * numero / len(ventanas))
+
+                # Pirámide de resoluciones reducidas dentro del propio archivo: la vista previa
+                # y los clientes GIS leen datos ya decimados sin decodificar el raster completo
+                niveles_overview = _calcular_niveles_overview(alto, ancho)
+                if niveles_overview:
+                    dst.build_overviews(niveles_overview, Resampling.average)
+                    dst.update_tags(ns='rio_overview', resampling='average')
+
+            os.replace(ruta_temporal, ruta_salida)
+        finally:
+            # Si algo falló, no dejar el archivo temporal a medio escribir
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+
+        # Las overviews vuelven a leer y comprimir todas las teselas: es el último paso del avance
+        if progreso is not None:
+            progreso(1.0)
+
+    print("Cálculo de NDVI completado.")
+    _guardar_en_cache(clave_cache, vista_previa, ruta_salida)
+    # --- Fin de la lógica del cálculo ---
+    return vista_previa  # Retornar la vista previa del NDVI para la visualización
+
+
+def calcular_vista_previa_ndvi(ruta_rojo, ruta_nir, progreso=None):
+    """
+    Calcula el NDVI solo a la resolución de la GUI, sin generar ni guardar el raster completo.
+    Ambas bandas se leen ya decimadas (GDAL aprovecha las overviews o los niveles de
+    resolución de JP2 si existen), así el trabajo depende del tamaño de la vista previa.
+    Retorna la vista previa del NDVI.
+    """
+    print(
+        f"Iniciando vista previa para:\n Rojo: {ruta_rojo}\n NIR: {ruta_nir}")
+
+    # Verificar si los archivos de entrada existen
+    if not os.path.exists(ruta_rojo):
+        raise FileNotFoundError(f"Archivo no encontrado: {ruta_rojo}")
+    if not os.path.exists(ruta_nir):
+        raise FileNotFoundError(f"Archivo no encontrado: {ruta_nir}")
+
+    with rasterio.Env(**OPCIONES_GDAL), \
+            rasterio.open(ruta_rojo) as src_rojo, rasterio.open(ruta_nir) as src_nir:
+        if src_rojo.shape != src_nir.shape:
+            raise ValueError(
+                f"Las bandas tienen dimensiones distintas: Rojo {src_rojo.shape}, NIR {src_nir.shape}")
+
+        alto, ancho = src_rojo.shape
+        # GDAL remuestrea a cualquier tamaño: se lee directamente al tamaño final de la GUI
+        forma_vista_previa = _calcular_tamano_vista(alto, ancho)
+        # Leer ambas bandas a la vez: la Roja en un hilo auxiliar y la NIR en este
+        with ThreadPoolExecutor(max_workers=1) as lector_rojo:
+            futuro_rojo = lector_rojo.submit(
+                _leer_en_entorno, src_rojo, out_shape=forma_vista_previa, out_dtype='float32',
+                resampling=Resampling.nearest)
+            banda_nir = src_nir.read(1, out_shape=forma_vista_previa, out_dtype='float32',
+                                     resampling=Resampling.nearest)
+            banda_rojo = futuro_rojo.result()
+
+    # Copiar el resultado: con numexpr vive en un buffer compartido que el siguiente cálculo
+    # sobrescribiría, y la GUI (y la caché) no deben conservar referencias a él
+    vista_previa = _calcular_indice(banda_rojo, banda_nir).copy()
+    if progreso is not None:
+        progreso(1.0)
+    print("Vista previa de NDVI completada.")
+    return vista_previa
+
+
+def leer_vista_previa(ruta_ndvi):
+    """
+    Lee un GeoTIFF NDVI ya guardado directamente a la resolución de la GUI.
+    GDAL toma los datos de las overviews internas, sin decodificar el raster completo.
+    Los archivos int8 se reescalan a [-1, 1]. Retorna un array float32 con NaN sin datos.
+    """
+    with rasterio.Env(**OPCIONES_GDAL), rasterio.open(ruta_ndvi) as src:
+        alto, ancho = src.shape
+        datos = src.read(1, out_shape=_calcular_tamano_vista(alto, ancho),
+                         resampling=Resampling.nearest, masked=True)
+        vista_previa = datos.astype('float32')
+        if src.dtypes[0] == rasterio.int8:
+            vista_previa /= ESCALA_INT8
+    return vista_previa.filled(np.nan)
+
+
+def procesar_resultado_calculo(futuro, ruta_salida, label_estado):
+    """
+    Recoge el resultado de un cálculo terminado en el hilo de trabajo (debe llamarse desde el
+    hilo de la GUI), muestra el mensaje correspondiente y actualiza la etiqueta de estado.
+    ruta_salida es None si solo se calculó la vista previa.
+    Retorna la vista previa del NDVI si es exitoso, de lo contrario None.
+    """
+    try:
+        vista_previa = futuro.result()
 
-        # --- Fin de la lógica del cálculo ---
+        if ruta_salida is None:
+            # Solo vista previa: no hay archivo que anunciar
+            label_estado.config(
+                text="Estado: ¡Vista previa lista! (no se guardó ningún archivo)", foreground="green")
+            return vista_previa
 
         # Mostrar mensaje de éxito y actualizar estado
         label_estado.config(
@@ -101,7 +485,7 @@ def calcular_ndvi(ruta_rojo, ruta_nir, ruta_salida, label_estado):
             "Éxito", f"El archivo NDVI se ha guardado en:\n{ruta_salida}")
         # Imprimir en consola para depuración
         print("Cálculo y guardado exitoso.")
-        return ndvi  # Retornar el array NDVI calculado para la visualización
+        return vista_previa
 
     except FileNotFoundError as e:
         # Manejar error si los archivos de entrada no existen
@@ -127,132 +511,134 @@ def calcular_ndvi(ruta_rojo, ruta_nir, ruta_salida, label_estado):
         print(error_msg)  # Imprimir en consola para depuración
         return None
 
+# --- Paleta de colores del NDVI ---
+# Mapeo lineal de NDVI a RGB. NDVI va de -1 a +1 y queremos mapear:
+# -1 (agua/nubes) -> Café oscuro [165, 42, 42]
+# 0 (suelo) -> Amarillo/Marrón claro [255, 215, 0]
+# +1 (vegetación) -> Verde intenso [34, 139, 34]
+
+# Brown - Un café más rojizo
+COLOR_BAJO = np.array([165, 42, 42], dtype=np.uint8)
+# Gold - Un amarillo más dorado
+COLOR_MEDIO = np.array([255, 215, 0], dtype=np.uint8)
+# ForestGreen - Un verde bosque
+COLOR_ALTO = np.array([34, 139, 34], dtype=np.uint8)
+# Negro para valores sin datos (NaN)
+COLOR_NODATA = np.array([0, 0, 0], dtype=np.uint8)
+
+
+def _construir_lut():
+    """
+    Precalcula la paleta como una tabla (256, 3) de colores uint8.
+    El índice i corresponde al NDVI i / 127.5 - 1; cada canal se interpola linealmente
+    entre los puntos de control -1 (COLOR_BAJO), 0 (COLOR_MEDIO) y +1 (COLOR_ALTO).
+    """
+    ndvi_indices = np.arange(256, dtype=np.float32) / 127.5 - 1
+    puntos_ndvi = np.array([-1.0, 0.0, 1.0], dtype=np.float32)
+    colores_control = np.stack([COLOR_BAJO, COLOR_MEDIO, COLOR_ALTO])
+    # Un np.interp por canal (R, G, B): sin ramas ni máscaras por tramo
+    canales = [np.interp(ndvi_indices, puntos_ndvi, colores_control[:, canal])
+               for canal in range(3)]
+    return np.stack(canales, axis=1).astype(np.uint8)
+
+
+# Tabla de colores calculada una sola vez al importar el módulo
+LUT_NDVI = _construir_lut()
+
+
+# Tamaño máximo de la imagen en la GUI sin ser demasiado grande
+MAX_GUI_WIDTH = 500  # Aumentar un poco el tamaño máximo para la visualización
+MAX_GUI_HEIGHT = 400  # Aumentar un poco el tamaño máximo para la visualización
+
+
+def _calcular_tamano_vista(alto, ancho):
+    """
+    Calcula el tamaño (alto, ancho) con el que un raster de alto x ancho se muestra en la GUI:
+    el mayor que cabe en el tamaño máximo conservando la relación de aspecto, sin ampliar.
+    """
+    if alto <= MAX_GUI_HEIGHT and ancho <= MAX_GUI_WIDTH:
+        return alto, ancho
+    ratio = min(MAX_GUI_WIDTH / ancho, MAX_GUI_HEIGHT / alto)
+    return max(1, int(alto * ratio)), max(1, int(ancho * ratio))
+
+
+def _calcular_paso(alto, ancho):
+    """
+    Calcula el paso de decimación (cada cuántos píxeles se toma uno) previo a colorear.
+    Se redondea hacia abajo para que el array reducido nunca quede por debajo del tamaño
+    de la GUI; el ajuste final lo hace el redimensionado de la imagen.
+    """
+    return max(1, alto // MAX_GUI_HEIGHT, ancho // MAX_GUI_WIDTH)
+
+
 # --- Función para aplicar paleta de colores y mostrar imagen ---
 
 
-def mostrar_ndvi_en_gui(ndvi_array, image_label):
+def mostrar_ndvi_en_gui(ndvi_array, canvas_imagen):
     """
-    Aplica una paleta de colores al array NDVI y lo muestra en un widget Label de Tkinter.
+    Aplica una paleta de colores al array NDVI y lo muestra en el ítem de imagen
+    persistente (canvas_imagen.image_id) de un Canvas de Tkinter.
     Asegura que los valores NaN se muestren en negro.
     """
     print("Entrando a mostrar_ndvi_en_gui...")  # Debug print
 
     if ndvi_array is None:
         print("NDVI array is None, clearing image.")  # Debug print
-        image_label.config(image='')  # Limpiar imagen si no hay datos
-        image_label.image = None
+        # Limpiar imagen si no hay datos
+        canvas_imagen.itemconfig(canvas_imagen.image_id, image='')
+        canvas_imagen.image = None
         root.update_idletasks()  # Try updating GUI
         return
 
     # Debug print
     print(f"NDVI array shape: {ndvi_array.shape}, dtype: {ndvi_array.dtype}")
 
-    # Definir la paleta de colores (mapeo lineal de NDVI a RGB)
-    # NDVI va de -1 a +1
-    # Queremos mapear:
-    # -1 (agua/nubes) -> Café oscuro [165, 42, 42]
-    # 0 (suelo) -> Amarillo/Marrón claro [255, 215, 0]
-    # +1 (vegetación) -> Verde intenso [34, 139, 34]
-
-    # Definir colores clave (RGB 0-255) con tonalidades ajustadas
-    # Brown - Un café más rojizo
-    color_bajo = np.array([165, 42, 42], dtype=np.uint8)
-    # Gold - Un amarillo más dorado
-    color_medio = np.array([255, 215, 0], dtype=np.uint8)
-    # ForestGreen - Un verde bosque
-    color_alto = np.array([34, 139, 34], dtype=np.uint8)
-    # Negro para valores sin datos (NaN)
-    color_nodata = np.array([0, 0, 0], dtype=np.uint8)
-
-    # Crear una imagen RGB completamente negra con las mismas dimensiones que el array NDVI
-    height, width = ndvi_array.shape  # Usar las dimensiones originales
-    rgb_image_array = np.full((height, width, 3), color_nodata, dtype=np.uint8)
-
-    print("RGB image array initialized with nodata color (black).")  # Debug print
-
-    # Crear una máscara para identificar los píxeles que NO son NaN
-    mascara_no_nan = ~np.isnan(ndvi_array)
-    print(f"Shape of mascara_no_nan: {mascara_no_nan.shape}")  # Debug print
-    print(f"Number of non-NaN pixels: {np.sum(mascara_no_nan)}")  # Debug print
-
-    # Aplicar la lógica de color solo a los píxeles que NO son NaN
-    ndvi_validos = ndvi_array[mascara_no_nan]
-    print(f"Shape of ndvi_validos: {ndvi_validos.shape}")  # Debug print
-    print(f"Size of ndvi_validos: {ndvi_validos.size}")  # Debug print
-    # --- Nueva línea de depuración para imprimir el dtype ---
-    print(f"Dtype of ndvi_validos: {ndvi_validos.dtype}")  # Debug print
-    # --- Fin de la nueva línea de depuración ---
-
-    if ndvi_validos.size > 0:  # Asegurarse de que haya píxeles válidos
-        print("Processing valid NDVI values...")  # Debug print
-        # Imprimir estadísticas de los valores NDVI válidos
-        # Corregido el formato de impresión para mostrar los valores
-        print(f"Min NDVI valid: {np.min(ndvi_validos)}")  # Debug print
-        print(f"Max NDVI valid: {np.max(ndvi_validos)}")  # Debug print
-        print(f"Mean NDVI valid: {np.mean(ndvi_validos)}")  # Debug print
-
-        # Asegurar que los valores válidos estén dentro del rango [-1, 1]
-        ndvi_validos_clipped = np.clip(ndvi_validos, -1, 1)
-        # Normalizar al rango [0, 1]
-        ndvi_normalized = (ndvi_validos_clipped + 1) / 2.0
-
-        # Crear un array para almacenar los colores interpolados para los píxeles válidos
-        colores_interpolados = np.empty((ndvi_validos.size, 3), dtype=np.uint8)
-
-        # Interpolar colores basándose en el valor normalizado
-        # Mapeo lineal: 0 a 0.5 -> color_bajo a color_medio
-        #              0.5 a 1.0 -> color_medio a color_alto
-        mascara_bajo_medio = ndvi_normalized < 0.5
-        mascara_medio_alto = ndvi_normalized >= 0.5
-
-        # Interpolar para el rango bajo-medio
-        factores_bajo_medio = ndvi_normalized[mascara_bajo_medio] / 0.5
-        colores_interpolados[mascara_bajo_medio] = (
-            (1 - factores_bajo_medio[:, np.newaxis]) * color_bajo + factores_bajo_medio[:, np.newaxis] * color_medio).astype(np.uint8)
-        # Debug print
-        print(
-            f"Assigned colors to {np.sum(mascara_bajo_medio)} pixels (bajo-medio range).")
-
-        # Interpolar para el rango medio-alto
-        factores_medio_alto = (ndvi_normalized[mascara_medio_alto] - 0.5) / 0.5
-        colores_interpolados[mascara_medio_alto] = (
-            (1 - factores_medio_alto[:, np.newaxis]) * color_medio + factores_medio_alto[:, np.newaxis] * color_alto).astype(np.uint8)
-        # Debug print
-        print(
-            f"Assigned colors to {np.sum(mascara_medio_alto)} pixels (medio-alto range).")
-
-        # Asignar los colores interpolados de vuelta al array de imagen RGB principal
-        # ¡Importante! Solo asignamos a los píxeles que originalmente no eran NaN
-        rgb_image_array[mascara_no_nan] = colores_interpolados
-
-    else:
-        print("No valid NDVI pixels found (ndvi_validos.size is 0).")  # Debug print
+    # Reducir el NDVI a la resolución de pantalla ANTES de colorear: colorear el raster
+    # completo para luego encogerlo desperdicia casi todo el trabajo por píxel
+    alto_vista, ancho_vista = _calcular_tamano_vista(*ndvi_array.shape)
+    paso = _calcular_paso(*ndvi_array.shape)
+    if paso > 1:
+        ndvi_array = ndvi_array[::paso, ::paso]
+        print(f"NDVI decimated by {paso} to {ndvi_array.shape}")  # Debug print
+
+    # Crear una imagen RGB sin inicializar con las mismas dimensiones que el array NDVI reducido.
+    # La paleta la sobrescribe entera y solo los NaN se pintan de negro después,
+    # en vez de llenar toda la imagen de negro para luego sobrescribirla casi entera
+    height, width = ndvi_array.shape
+    rgb_image_array = np.empty((height, width, 3), dtype=np.uint8)
+
+    # Máscara de los píxeles sin datos (NaN), calculada una sola vez
+    mascara_nan = np.isnan(ndvi_array)
+
+    if DEBUG:
+        # Estadísticas de depuración: cada una recorre el array otra vez, así que solo en modo DEBUG
+        ndvi_validos = ndvi_array[~mascara_nan]
+        print(f"Number of non-NaN pixels: {ndvi_validos.size}")  # Debug print
+        if ndvi_validos.size > 0:
+            print(f"Min NDVI valid: {np.min(ndvi_validos)}")  # Debug print
+            print(f"Max NDVI valid: {np.max(ndvi_validos)}")  # Debug print
+            print(f"Mean NDVI valid: {np.mean(ndvi_validos)}")  # Debug print
+
+    # Convertir cada NDVI en [-1, 1] a un índice 0..255 de la paleta precalculada y obtener
+    # todos los colores con una sola indexación, escribiendo directamente en la imagen.
+    # Se opera sobre el array completo (sin extraer los válidos); los NaN se corrigen después
+    with np.errstate(invalid='ignore'):
+        indices = np.clip((ndvi_array + 1.0) * 127.5, 0, 255).astype(np.uint8)
+    np.take(LUT_NDVI, indices, axis=0, out=rgb_image_array)
+
+    # Pintar de negro solo los píxeles sin datos (NaN)
+    rgb_image_array[mascara_nan] = COLOR_NODATA
 
     print("Color assignment finished.")  # Debug print
 
     # Convertir el array RGB a una imagen de Pillow
     img_pil = Image.fromarray(rgb_image_array, 'RGB')
+    # Ajuste final al tamaño de la GUI (la decimación entera solo deja el array cerca de él)
+    if img_pil.size != (ancho_vista, alto_vista):
+        img_pil = img_pil.resize((ancho_vista, alto_vista), Image.Resampling.NEAREST)
 
     print(f"Pillow image created with size: {img_pil.size}")  # Debug print
 
-    # Redimensionar la imagen para que quepa en la GUI sin ser demasiado grande
-    max_gui_width = 500  # Aumentar un poco el tamaño máximo para la visualización
-    max_gui_height = 400  # Aumentar un poco el tamaño máximo para la visualización
-
-    original_width, original_height = img_pil.size
-
-    if original_width > max_gui_width or original_height > max_gui_height:
-        print("Resizing image for GUI display.")  # Debug print
-        # Calcular la nueva proporción manteniendo el aspecto
-        ratio = min(max_gui_width / original_width,
-                    max_gui_height / original_height)
-        new_width = int(original_width * ratio)
-        new_height = int(original_height * ratio)
-        # Usar un buen filtro de redimensionamiento
-        img_pil = img_pil.resize(
-            (new_width, new_height), Image.Resampling.LANCZOS)
-        print(f"Resized image size: {img_pil.size}")  # Debug print
-
     # Convertir la imagen de Pillow a un formato que Tkinter pueda usar
     try:
         img_tk = ImageTk.PhotoImage(img_pil)
@@ -262,25 +648,26 @@ def mostrar_ndvi_en_gui(ndvi_array, image_label):
         print(f"Error converting Pillow image to ImageTk.PhotoImage: {e}")
         messagebox.showerror("Error de Visualización",
                              f"No se pudo convertir la imagen para mostrar: {e}")
-        image_label.config(image='')
-        image_label.image = None
+        canvas_imagen.itemconfig(canvas_imagen.image_id, image='')
+        canvas_imagen.image = None
         root.update_idletasks()
         return
 
-    # Mostrar la imagen en el widget Label
+    # Mostrar la imagen reemplazando la del ítem del Canvas (el widget no se vuelve a maquetar)
     try:
-        image_label.config(image=img_tk)
-        # Guardar una referencia a la imagen para evitar que sea eliminada por el recolector de basura
-        image_label.image = img_tk
-        print("Image set on label.")  # Debug print
+        canvas_imagen.itemconfig(canvas_imagen.image_id, image=img_tk)
+        # Guardar una referencia a la imagen para evitar que sea eliminada por el recolector de basura.
+        # Al reemplazarla, la imagen anterior se libera de inmediato
+        canvas_imagen.image = img_tk
+        print("Image set on canvas.")  # Debug print
         root.update_idletasks()  # Try updating GUI after setting image
         print("GUI updated after setting image.")  # Debug print
     except Exception as e:
-        print(f"Error setting image on label: {e}")  # Debug print
+        print(f"Error setting image on canvas: {e}")  # Debug print
         messagebox.showerror("Error de Visualización",
                              f"No se pudo mostrar la imagen en la ventana: {e}")
-        image_label.config(image='')
-        image_label.image = None
+        canvas_imagen.itemconfig(canvas_imagen.image_id, image='')
+        canvas_imagen.image = None
         root.update_idletasks()
 
 
@@ -391,38 +778,144 @@ boton_salida.grid(row=2, column=2, sticky=tk.W, pady=5, padx=5)
 # Botón para Calcular NDVI
 
 
+# El cálculo se ejecuta en un hilo de trabajo para no congelar la GUI.
+# rasterio libera el GIL durante la E/S de GDAL y NumPy en sus ufuncs,
+# así que el bucle de Tk sigue redibujando mientras tanto.
+ejecutor_calculo = ThreadPoolExecutor(max_workers=1)
+
+
 def on_calcular_click():
-    boton_calcular.config(state=tk.DISABLED)
     ruta_rojo = entry_rojo.get()
     ruta_nir = entry_nir.get()
     ruta_salida = entry_salida.get()
+    cuantizar_int8 = var_int8.get()
+    solo_vista_previa = var_solo_vista_previa.get()
+
+    # Validar que las rutas no estén vacías (la de salida no hace falta si solo se visualiza)
+    if not ruta_rojo or not ruta_nir or not (ruta_salida or solo_vista_previa):
+        messagebox.showwarning(
+            "Advertencia", "Por favor, especifica las rutas de los archivos de entrada y salida.")
+        label_estado_calculadora.config(
+            text="Estado: Faltan rutas", foreground="red")
+        return
+
+    # Mientras el hilo escribe el archivo de salida no se puede recargar su vista previa
+    boton_calcular.config(state=tk.DISABLED)
+    boton_vista_previa.config(state=tk.DISABLED)
+    # Actualizar el estado en la GUI
+    label_estado_calculadora.config(
+        text="Estado: Calculando...", foreground="orange")
+    barra_progreso.config(value=0)
 
-    # Llamar a la función de cálculo
-    ndvi_resultado_array = calcular_ndvi(
-        ruta_rojo, ruta_nir, ruta_salida, label_estado_calculadora)
+    # El hilo de trabajo solo escribe la fracción completada; la GUI la lee al sondear
+    avance = {'fraccion': 0.0}
+
+    def actualizar_avance(fraccion):
+        avance['fraccion'] = fraccion
+
+    # Lanzar el cálculo en segundo plano y revisar periódicamente si terminó
+    if solo_vista_previa:
+        ruta_salida = None
+        futuro = ejecutor_calculo.submit(
+            calcular_vista_previa_ndvi, ruta_rojo, ruta_nir, actualizar_avance)
+    else:
+        futuro = ejecutor_calculo.submit(
+            calcular_ndvi, ruta_rojo, ruta_nir, ruta_salida, actualizar_avance,
+            cuantizar_int8=cuantizar_int8)
+    root.after(100, revisar_calculo, futuro, avance, ruta_salida)
+
+
+def revisar_calculo(futuro, avance, ruta_salida):
+    """Sondea el cálculo en segundo plano desde el bucle de Tk hasta que termina."""
+    barra_progreso.config(value=avance['fraccion'] * 100)
+    if not futuro.done():
+        root.after(100, revisar_calculo, futuro, avance, ruta_salida)
+        return
+
+    ndvi_resultado_array = procesar_resultado_calculo(
+        futuro, ruta_salida, label_estado_calculadora)
 
     # Si el cálculo fue exitoso, mostrar la imagen
     if ndvi_resultado_array is not None:
-        mostrar_ndvi_en_gui(ndvi_resultado_array, label_imagen_ndvi)
+        mostrar_ndvi_en_gui(ndvi_resultado_array, canvas_imagen_ndvi)
 
     boton_calcular.config(state=tk.NORMAL)
+    boton_vista_previa.config(state=tk.NORMAL)
 
 
+# Frame para el botón de cálculo y sus opciones
+frame_acciones = ttk.Frame(frame_calculadora)
+frame_acciones.grid(row=3, column=0, columnspan=3, pady=15)
+
 boton_calcular = ttk.Button(
-    frame_calculadora, text="Calcular NDVI", command=on_calcular_click)
-boton_calcular.grid(row=3, column=0, columnspan=3, pady=15)
+    frame_acciones, text="Calcular NDVI", command=on_calcular_click)
+boton_calcular.pack(side=tk.LEFT, padx=5)
+
+# Opción para guardar el NDVI como int8 (4 veces más liviano que float32)
+var_int8 = tk.BooleanVar(value=False)
+check_int8 = ttk.Checkbutton(
+    frame_acciones, text="Guardar como int8 (NDVI x127)", variable=var_int8)
+check_int8.pack(side=tk.LEFT, padx=5)
+
+# Opción para solo visualizar el NDVI, calculándolo a resolución de pantalla sin guardarlo
+var_solo_vista_previa = tk.BooleanVar(value=False)
+check_solo_vista_previa = ttk.Checkbutton(
+    frame_acciones, text="Solo vista previa (sin guardar)", variable=var_solo_vista_previa)
+check_solo_vista_previa.pack(side=tk.LEFT, padx=5)
+
+# Botón para volver a mostrar el NDVI guardado sin recalcularlo
+
+
+def on_vista_previa_click():
+    ruta_salida = entry_salida.get()
+    if not ruta_salida or not os.path.exists(ruta_salida):
+        messagebox.showwarning(
+            "Advertencia", "Por favor, especifica un archivo NDVI de salida ya calculado.")
+        return
+
+    try:
+        vista_previa = leer_vista_previa(ruta_salida)
+    except rasterio.errors.RasterioIOError as e:
+        # Manejar errores de lectura del archivo raster
+        error_msg = f"Error de E/S de Rasterio: {e}"
+        messagebox.showerror("Error de Rasterio", error_msg)
+        print(error_msg)  # Imprimir en consola para depuración
+        return
+    except Exception as e:
+        # Manejar cualquier otro error inesperado
+        error_msg = f"Ocurrió un error inesperado: {e}"
+        messagebox.showerror("Error", error_msg)
+        print(error_msg)  # Imprimir en consola para depuración
+        return
+
+    mostrar_ndvi_en_gui(vista_previa, canvas_imagen_ndvi)
+
+
+boton_vista_previa = ttk.Button(
+    frame_acciones, text="Actualizar vista previa", command=on_vista_previa_click)
+boton_vista_previa.pack(side=tk.LEFT, padx=5)
 
 # Etiqueta para mostrar el Estado en la pestaña Calculadora
 label_estado_calculadora = ttk.Label(
     frame_calculadora, text="Estado: Listo", foreground="blue")
 label_estado_calculadora.grid(
-    row=4, column=0, columnspan=3, sticky=tk.W + tk.E, padx=5, pady=5)
+    row=4, column=0, columnspan=2, sticky=tk.W + tk.E, padx=5, pady=5)
+
+# Barra de progreso del cálculo, avanzada bloque a bloque
+barra_progreso = ttk.Progressbar(
+    frame_calculadora, mode='determinate', maximum=100)
+barra_progreso.grid(row=4, column=2, sticky=tk.W + tk.E, padx=5, pady=5)
 
-# Widget Label para mostrar la imagen del NDVI
+# Canvas para mostrar la imagen del NDVI, con un único ítem de imagen que se reutiliza
+# en cada cálculo (y que más adelante permitiría desplazar o hacer zoom sin recolorear)
 # Usamos sticky para que se expanda en todas direcciones dentro de su celda
-label_imagen_ndvi = ttk.Label(frame_calculadora)
-label_imagen_ndvi.grid(row=5, column=0, columnspan=3,
-                       sticky=(tk.W, tk.E, tk.N, tk.S), padx=5, pady=5)
+canvas_imagen_ndvi = tk.Canvas(
+    frame_calculadora, width=MAX_GUI_WIDTH, height=MAX_GUI_HEIGHT, highlightthickness=0)
+canvas_imagen_ndvi.grid(row=5, column=0, columnspan=3,
+                        sticky=(tk.W, tk.E, tk.N, tk.S), padx=5, pady=5)
+canvas_imagen_ndvi.image_id = canvas_imagen_ndvi.create_image(
+    0, 0, anchor=tk.NW)
+canvas_imagen_ndvi.image = None
 
 
 # --- Pestaña de Información ---
@@ -444,6 +937,8 @@ Instrucciones de uso:
 2.  **Seleccionar Banda NIR (B8):** Haz clic en "Buscar..." junto a "Ruta Banda NIR (B8)" y selecciona el archivo GeoTIFF o JP2 correspondiente a la banda Infrarrojo Cercano (B8) de tu imagen Sentinel-2.
     * La aplicación funciona con imágenes de Sentinel-2 que ya estén recortadas a tu área de interés. Asegúrate de usar las bandas correctas (B4 y B8).
 3.  **Especificar Archivo de Salida:** Haz clic en "Guardar como..." junto a "Ruta Archivo Salida NDVI" y elige la ubicación y el nombre para guardar el archivo GeoTIFF resultante con el cálculo del NDVI.
+    * Opcional: marca "Guardar como int8 (NDVI x127)" para obtener un archivo 4 veces más liviano. Cada valor guardado es el NDVI multiplicado por 127 (divídelo entre 127 en tu software GIS) y -128 indica píxeles sin datos.
+    * Opcional: marca "Solo vista previa (sin guardar)" si solo quieres ver el mapa. El NDVI se calcula directamente a la resolución de la pantalla, mucho más rápido, y no se guarda ningún archivo (no hace falta la ruta de salida).
 4.  **Calcular NDVI:** Una vez que hayas especificado las tres rutas, haz clic en el botón "Calcular NDVI".
 5.  **Ver Resultado:** La aplicación calculará el NDVI, guardará el archivo GeoTIFF de salida y **mostrará una visualización del mapa de NDVI con una paleta de colores en la parte inferior de esta pestaña "Calculadora"**. Las áreas fuera de tu estudio (sin datos) se mostrarán en color negro para distinguirlas. Puedes abrir el archivo GeoTIFF de salida en un software GIS (como QGIS o ArcGIS) para un análisis más detallado.
 